@@ -1,15 +1,13 @@
 import os
+import tempfile
 import streamlit as st
 import pandas as pd
-from dotenv import load_dotenv
-from db import fetch_df
+from db import fetch_df, warm_up
+from export import export as export_report
+from portfolio import DATE_BOUNDS_SQL as PORTFOLIO_DATE_BOUNDS_SQL, portfolio_query
+from etl.alerts import RECENT_ALERTS_SQL, RECENT_WINDOW_DAYS
 
-@st.cache_data(ttl=60)
-def q(sql: str, params: dict | None = None) -> pd.DataFrame:
-    return fetch_df(sql, params)
-
-
-load_dotenv()
+# db.py já carrega o .env ao ser importado
 st.set_page_config(
     page_title=os.getenv("APP_TITLE", "Dashboard"),
     page_icon="📊",
@@ -17,9 +15,16 @@ st.set_page_config(
 )
 
 @st.cache_data(ttl=60)
-def q(sql: str, params: dict | None = None):
+def q(sql: str, params: dict | None = None) -> pd.DataFrame:
     return fetch_df(sql, params)
 
+@st.cache_resource
+def _warm_db() -> None:
+    # Uma vez por processo: conexão já aberta no pool quando a primeira query chegar
+    warm_up()
+
+_warm_db()
+
 
 # ---------- Helpers ----------
 def brl(x: float) -> str:
@@ -133,18 +138,27 @@ st.sidebar.header("Filtros")
 client_name = st.sidebar.selectbox("Cliente", list(client_name_to_id.keys()))
 client_id = client_name_to_id[client_name]
 
+# ---------- Snapshot da visão padrão (gerado pelo ETL) ----------
+# Uma leitura pequena: datas limite + dados dos últimos 7 dias já agregados
+snap = q("select payload from report_snapshots where client_id = :client_id", {"client_id": client_id})
+snapshot = snap.iloc[0]["payload"] if not snap.empty else None
+
 # ---------- Período no topo (selecionável e mobile-friendly) ----------
-minmax = fetch_df(
-    "select min(date) as min_date, max(date) as max_date from daily_metrics where client_id = :client_id",
-    {"client_id": client_id}
-)
+if snapshot is not None:
+    min_date = pd.to_datetime(snapshot["min_date"]).date()
+    max_date = pd.to_datetime(snapshot["max_date"]).date()
+else:
+    minmax = fetch_df(
+        "select min(date) as min_date, max(date) as max_date from daily_metrics where client_id = :client_id",
+        {"client_id": client_id}
+    )
 
-if minmax.empty or pd.isna(minmax.iloc[0]["min_date"]):
-    st.warning("Esse cliente ainda não tem dados em `daily_metrics`. Rode o ETL para popular.")
-    st.stop()
+    if minmax.empty or pd.isna(minmax.iloc[0]["min_date"]):
+        st.warning("Esse cliente ainda não tem dados em `daily_metrics`. Rode o ETL para popular.")
+        st.stop()
 
-min_date = pd.to_datetime(minmax.iloc[0]["min_date"]).date()
-max_date = pd.to_datetime(minmax.iloc[0]["max_date"]).date()
+    min_date = pd.to_datetime(minmax.iloc[0]["min_date"]).date()
+    max_date = pd.to_datetime(minmax.iloc[0]["max_date"]).date()
 
 # Default: últimos 7 dias
 default_end = max_date
@@ -172,43 +186,53 @@ if start > end:
     st.error("A data inicial não pode ser maior que a final.")
     st.stop()
 
-min_date = minmax.iloc[0]["min_date"]
-max_date = minmax.iloc[0]["max_date"]
-
 platforms = st.sidebar.multiselect("Plataformas", ["meta", "google"], default=["meta", "google"])
 platform_filter = ""
 params = {"client_id": client_id, "start": start, "end": end}
 if platforms:
-    platform_filter = "and platform = any(:platforms)"
+    platform_filter = "and c.platform = any(:platforms)"
     params["platforms"] = platforms
 
 search_campaign = st.sidebar.text_input("Buscar campanha (contém)", placeholder="ex: Mensagens")
 
 campaign_filter = ""
 if search_campaign.strip():
-    campaign_filter = "and lower(coalesce(campaign_name,'')) like :q"
+    campaign_filter = "and lower(coalesce(c.campaign_name,'')) like :q"
     params["q"] = f"%{search_campaign.strip().lower()}%"
 
+# Visão padrão (7 dias, todas as plataformas, sem busca) sai do snapshot; filtro mudou -> query ao vivo
+use_snapshot = (
+    snapshot is not None
+    and start == default_start
+    and end == default_end
+    and set(platforms) == {"meta", "google"}
+    and not search_campaign.strip()
+)
+
 # ---------- Query dados ----------
-df = q(f"""
-    select
-      date,
-      platform,
-      campaign_id,
-      campaign_name,
-      spend,
-      impressions,
-      clicks,
-      leads,
-      conversations,
-      conversions
-    from daily_metrics
-    where client_id = :client_id
-      and date between :start and :end
-      {platform_filter}
-      {campaign_filter}
-    order by date asc
-""", params)
+# Fatos só têm chaves inteiras; `campaigns` entra para plataforma (e nome, se houver busca)
+if use_snapshot:
+    df = pd.DataFrame(snapshot["daily"])
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+else:
+    df = q(f"""
+        select
+          m.date,
+          c.platform,
+          m.spend,
+          m.impressions,
+          m.clicks,
+          m.leads,
+          m.conversations,
+          m.conversions
+        from daily_metrics m
+        join campaigns c on c.id = m.campaign_key
+        where m.client_id = :client_id
+          and m.date between :start and :end
+          {platform_filter}
+          {campaign_filter}
+        order by m.date asc
+    """, params)
 
 # ---------- Período anterior para deltas ----------
 period_days = (pd.to_datetime(end) - pd.to_datetime(start)).days + 1
@@ -219,19 +243,60 @@ params_prev = {"client_id": client_id, "start": prev_start.date(), "end": prev_e
 if platforms:
     params_prev["platforms"] = platforms
 
-df_prev = q(f"""
-    select spend, impressions, clicks, leads, conversations, conversions
-    from daily_metrics
-    where client_id = :client_id
-      and date between :start and :end
-      {platform_filter}
-""", params_prev)
+if use_snapshot:
+    # Totais do período anterior já somados pelo ETL
+    df_prev = pd.DataFrame([snapshot["prev"]])
+else:
+    # Sem filtro de plataforma não precisa de `campaigns`
+    campaigns_join = "join campaigns c on c.id = m.campaign_key" if platforms else ""
+    df_prev = q(f"""
+        select m.spend, m.impressions, m.clicks, m.leads, m.conversations, m.conversions
+        from daily_metrics m
+        {campaigns_join}
+        where m.client_id = :client_id
+          and m.date between :start and :end
+          {platform_filter}
+    """, params_prev)
 
 k = compute_kpis(df)
 k_prev = compute_kpis(df_prev)
 
+# ---------- Exportar (mesmos filtros, streaming do banco direto pro arquivo) ----------
+st.sidebar.divider()
+st.sidebar.subheader("Exportar dados")
+export_fmt = st.sidebar.radio("Formato", ["csv", "parquet"], horizontal=True)
+if st.sidebar.button("Gerar arquivo"):
+    fd, export_path = tempfile.mkstemp(suffix=f".{export_fmt}")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            export_rows = export_report(
+                f, export_fmt, client_id, start, end,
+                platforms=platforms, search=search_campaign,
+            )
+        with open(export_path, "rb") as f:
+            st.sidebar.download_button(
+                f"Baixar ({intfmt(export_rows)} linhas)",
+                data=f,
+                file_name=f"{client_name}_{start}_{end}.{export_fmt}",
+            )
+    finally:
+        os.remove(export_path)
+
+# ---------- Alertas (gerados pelo ETL; aqui é só leitura) ----------
+# Vêm no snapshot (não dependem dos filtros); query só se o snapshot for antigo/inexistente
+if snapshot is not None and "alerts" in snapshot:
+    alerts = pd.DataFrame(
+        snapshot["alerts"],
+        columns=["date", "platform", "campaign_name", "metric", "value", "expected"],
+    )
+else:
+    alerts = q(RECENT_ALERTS_SQL, {
+        "client_id": client_id,
+        "since": (pd.to_datetime(max_date) - pd.Timedelta(days=RECENT_WINDOW_DAYS - 1)).date(),
+    })
+
 # ---------- Tabs ----------
-(tab1,) = st.tabs(["📌 Visão Geral"])
+tab1, tab2, tab3 = st.tabs(["📌 Visão Geral", f"⚠️ Alertas ({len(alerts)})", "🏢 Portfólio"])
 with tab1:
     # ---------- KPIs (HTML grid: 2 cols mobile / 3 cols desktop + fade up) ----------
     d_spend  = delta_pct(k["spend"], k_prev["spend"])
@@ -326,4 +391,76 @@ with tab1:
         else:
             st.dataframe(by_plat.sort_values("spend", ascending=False), use_container_width=True)
 
+with tab2:
+    st.subheader("Dias fora do padrão (últimos 14 dias)")
+    if alerts.empty:
+        st.info("Nenhum alerta no período.")
+    else:
+        view = alerts.copy()
+        view["metric"] = view["metric"].map({"spend": "Investimento", "cpconv": "Custo / Conversa"})
+        view["desvio"] = (view["value"] / view["expected"].replace(0, pd.NA) - 1) * 100
+        view = view.rename(columns={
+            "date": "Data", "platform": "Plataforma", "campaign_name": "Campanha",
+            "metric": "Métrica", "value": "Valor", "expected": "Esperado", "desvio": "Desvio %",
+        })
+        st.dataframe(view, use_container_width=True, hide_index=True)
+
+with tab3:
+    st.subheader("Todos os clientes vs período anterior")
+    # Streamlit roda o corpo de todas as abas a cada rerun: a query de todos os clientes
+    # só roda quando pedida (depois fica no cache como as demais)
+    if not st.toggle("Carregar portfólio", value=False):
+        st.caption("Compara investimento, CPC e custo por conversa de todos os clientes.")
+    else:
+        # Período próprio: os limites são os de todos os clientes, não só do selecionado
+        bounds = q(PORTFOLIO_DATE_BOUNDS_SQL)
+        pf_min = pd.to_datetime(bounds.iloc[0]["min_date"]).date()
+        pf_max = pd.to_datetime(bounds.iloc[0]["max_date"]).date()
+        pf_default_start = max(pf_min, (pd.to_datetime(pf_max) - pd.Timedelta(days=6)).date())
+
+        p1, p2 = st.columns(2)
+        pf_start = p1.date_input(
+            "Data inicial", value=pf_default_start,
+            min_value=pf_min, max_value=pf_max, key="start_portfolio",
+        )
+        pf_end = p2.date_input(
+            "Data final", value=pf_max,
+            min_value=pf_min, max_value=pf_max, key="end_portfolio",
+        )
+        if pf_start > pf_end:
+            st.error("A data inicial não pode ser maior que a final.")
+            st.stop()
+
+        pf = q(*portfolio_query(pf_start, pf_end))
+        # O grouping set () sempre devolve a linha de total, mesmo sem dados
+        total = pf[pf["level"] == "total"].iloc[0]
+        if total["spend"] == 0:
+            st.info("Sem dados no período selecionado.")
+        else:
+            c1, c2, c3 = st.columns(3)
+            for col, title, value, d in [
+                (c1, "Investimento", total["spend"], total["d_spend"]),
+                (c2, "CPC", total["cpc"], total["d_cpc"]),
+                (c3, "Custo / Conversa", total["cpconv"], total["d_cpconv"]),
+            ]:
+                col.metric(
+                    title,
+                    brl(float(value)) if pd.notna(value) else "—",
+                    f"{float(d):+.1f}%" if pd.notna(d) else None,
+                )
+
+            cols = {
+                "client_name": "Cliente", "platform": "Plataforma",
+                "spend": "Investimento", "d_spend": "Δ Invest. %",
+                "cpc": "CPC", "d_cpc": "Δ CPC %",
+                "cpconv": "Custo / Conversa", "d_cpconv": "Δ Custo/Conv %",
+            }
+            by_client = pf[pf["level"] == "client"][list(cols)].drop(columns="platform")
+            st.dataframe(
+                by_client.sort_values("spend", ascending=False).rename(columns=cols),
+                use_container_width=True, hide_index=True,
+            )
 
+            with st.expander("Por plataforma"):
+                by_plat_all = pf[pf["level"] == "platform"][list(cols)]
+                st.dataframe(by_plat_all.rename(columns=cols), use_container_width=True, hide_index=True)
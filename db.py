@@ -1,32 +1,58 @@
 import os
-import pandas as pd
+import threading
+from typing import TYPE_CHECKING
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
 
+# pandas só é carregado por quem lê DataFrame (app.py); o ETL grava sem ele
+if TYPE_CHECKING:
+    import pandas as pd
+
 load_dotenv()
 
 _ENGINE = None
+_ENGINE_LOCK = threading.Lock()
 
 def get_engine():
     global _ENGINE
     if _ENGINE is not None:
         return _ENGINE
 
-    db_url = os.getenv("DATABASE_URL")
-    if not db_url:
-        raise RuntimeError("DATABASE_URL não definido no .env")
-
-    # Pool básico (bom pra Streamlit)
-    _ENGINE = create_engine(
-        db_url,
-        pool_pre_ping=True,
-        pool_size=5,
-        max_overflow=10,
-        pool_recycle=1800,  # evita conexões velhas
-    )
-    return _ENGINE
-
-def fetch_df(query: str, params: dict | None = None) -> pd.DataFrame:
+    with _ENGINE_LOCK:  # warm_up() pode estar criando ao mesmo tempo
+        if _ENGINE is not None:
+            return _ENGINE
+
+        db_url = os.getenv("DATABASE_URL")
+        if not db_url:
+            raise RuntimeError("DATABASE_URL não definido no .env")
+
+        # Pool básico (bom pra Streamlit)
+        _ENGINE = create_engine(
+            db_url,
+            pool_pre_ping=True,
+            pool_size=5,
+            max_overflow=10,
+            pool_recycle=1800,  # evita conexões velhas
+        )
+        return _ENGINE
+
+def warm_up() -> None:
+    """
+    Cria o engine e abre a primeira conexão em background: o driver e o handshake
+    com o Postgres rodam enquanto a página monta, não na primeira query.
+    """
+    def _connect():
+        try:
+            with get_engine().connect():
+                pass
+        except Exception:
+            pass  # a primeira query de verdade mostra o erro
+
+    threading.Thread(target=_connect, daemon=True).start()
+
+def fetch_df(query: str, params: dict | None = None) -> "pd.DataFrame":
+    import pandas as pd
+
     engine = get_engine()
     with engine.connect() as conn:
         return pd.read_sql(text(query), conn, params=params or {})
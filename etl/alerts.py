@@ -0,0 +1,167 @@
+import math
+import os
+from datetime import date, timedelta
+from sqlalchemy import text
+
+# EWMA: peso do dia novo (0.2 ~ "memória" de uns 10 dias)
+ALPHA = 0.2
+# Só alerta depois de ver alguns dias da campanha
+MIN_SAMPLES = 7
+# Quantos desvios-padrão longe da média para virar alerta
+Z_THRESHOLD = 3.0
+# E pelo menos essa variação relativa (evita alerta de centavos em campanha muito estável)
+MIN_REL_CHANGE = 0.25
+# Dias até um dia "assentar": gasto e conversas atribuídos depois ainda chegam pelo backfill.
+# Cada dia entra uma vez só nas estatísticas, então só entra depois disso (env ETL_ALERT_SETTLE_DAYS).
+ALERT_SETTLE_DAYS = int(os.getenv("ETL_ALERT_SETTLE_DAYS", "3"))
+
+# Dias assentados ainda não contabilizados das campanhas tocadas (lidos do banco, não do que
+# mudou: um dia que não mudou na última correção do backfill também entra)
+PENDING_SQL = """
+select m.campaign_key, m.client_id, m.date, m.spend, m.conversations
+from daily_metrics m
+where m.campaign_key = any(:keys)
+  and m.date < :settled_before
+  and m.date > coalesce(
+    (select min(s.last_date) from alert_stats s where s.campaign_key = m.campaign_key),
+    '-infinity'::date
+  )
+order by m.campaign_key, m.date;
+"""
+
+# Alertas recentes de um cliente (aba do dashboard e snapshot da visão padrão)
+RECENT_WINDOW_DAYS = 14
+RECENT_ALERTS_SQL = """
+select a.date, c.platform, c.campaign_name, a.metric, a.value, a.expected
+from alerts a
+join campaigns c on c.id = a.campaign_key
+where a.client_id = :client_id
+  and a.date >= :since
+order by a.date desc, abs(a.zscore) desc
+limit 50
+"""
+
+STATS_SQL = """
+select campaign_key, metric, n, mean, var, last_date
+from alert_stats
+where campaign_key = any(:keys);
+"""
+
+STATS_UPSERT_SQL = """
+insert into alert_stats (campaign_key, metric, client_id, n, mean, var, last_date, updated_at)
+values (:campaign_key, :metric, :client_id, :n, :mean, :var, :last_date, now())
+on conflict (campaign_key, metric)
+do update set
+  n = excluded.n,
+  mean = excluded.mean,
+  var = excluded.var,
+  last_date = excluded.last_date,
+  updated_at = now();
+"""
+
+ALERT_INSERT_SQL = """
+insert into alerts (client_id, campaign_key, date, metric, value, expected, zscore)
+values (:client_id, :campaign_key, :date, :metric, :value, :expected, :zscore)
+on conflict (campaign_key, date, metric) do nothing;
+"""
+
+METRICS = ("spend", "cpconv")
+
+def _metric_values(row) -> dict:
+    """Valores observados no dia: gasto (pacing) e custo por conversa (quando houve conversa)."""
+    spend = float(row.spend or 0)
+    out = {"spend": spend}
+    if row.conversations:
+        out["cpconv"] = spend / row.conversations
+    return out
+
+def _check(state: dict, x: float) -> float | None:
+    """z-score de `x` contra o estado atual, ou None se não for outlier."""
+    if state["n"] < MIN_SAMPLES or state["var"] <= 0:
+        return None
+    z = (x - state["mean"]) / math.sqrt(state["var"])
+    if abs(z) < Z_THRESHOLD:
+        return None
+    if abs(x - state["mean"]) < MIN_REL_CHANGE * abs(state["mean"]):
+        return None
+    return z
+
+def _fold(state: dict, x: float) -> None:
+    """Atualiza média/variância exponenciais com uma nova observação."""
+    if state["n"] == 0:
+        state["mean"], state["var"] = x, 0.0
+    else:
+        diff = x - state["mean"]
+        incr = ALPHA * diff
+        state["mean"] += incr
+        state["var"] = (1 - ALPHA) * (state["var"] + diff * incr)
+    state["n"] += 1
+
+def update_alerts(conn, campaign_keys, today: date | None = None,
+                  settle_days: int = ALERT_SETTLE_DAYS) -> int:
+    """
+    Para as campanhas gravadas agora, lê de `daily_metrics` os dias assentados (mais de
+    `settle_days` dias antes de hoje) mais novos que o último já contabilizado, atualiza as
+    estatísticas e grava em `alerts` os dias fora do padrão. Roda na transação `conn` de quem
+    gravou. Retorna quantos alertas novos.
+
+    Reprocessar o mesmo período não conta duas vezes: cada dia entra uma vez só por campanha.
+    `settle_days` precisa ser menor que a janela do backfill para o dia ser relido antes.
+    """
+    keys = sorted(campaign_keys)
+    if not keys:
+        return 0
+    today = today or date.today()
+    settled_before = today - timedelta(days=settle_days)
+
+    rows = conn.execute(text(PENDING_SQL), {"keys": keys, "settled_before": settled_before}).all()
+    if not rows:
+        return 0
+
+    states = {
+        (s.campaign_key, s.metric): {"n": s.n, "mean": s.mean, "var": s.var, "last_date": s.last_date}
+        for s in conn.execute(text(STATS_SQL), {"keys": sorted({r.campaign_key for r in rows})})
+    }
+    touched = {}
+    n_alerts = 0
+
+    for r in rows:
+        values = _metric_values(r)
+        for metric in METRICS:
+            sk = (r.campaign_key, metric)
+            state = states.setdefault(sk, {"n": 0, "mean": 0.0, "var": 0.0, "last_date": None})
+            if state["last_date"] is not None and r.date <= state["last_date"]:
+                continue
+
+            x = values.get(metric)
+            if x is not None:
+                z = _check(state, x)
+                if z is not None:
+                    res = conn.execute(text(ALERT_INSERT_SQL), {
+                        "client_id": r.client_id,
+                        "campaign_key": r.campaign_key,
+                        "date": r.date,
+                        "metric": metric,
+                        "value": x,
+                        "expected": state["mean"],
+                        "zscore": z,
+                    })
+                    n_alerts += res.rowcount
+                _fold(state, x)
+
+            # Avança mesmo sem valor (dia sem conversa) para as métricas andarem juntas
+            state["last_date"] = r.date
+            touched[sk] = r.client_id
+
+    for (campaign_key, metric), client_id in touched.items():
+        state = states[(campaign_key, metric)]
+        conn.execute(text(STATS_UPSERT_SQL), {
+            "campaign_key": campaign_key,
+            "metric": metric,
+            "client_id": client_id,
+            "n": state["n"],
+            "mean": state["mean"],
+            "var": state["var"],
+            "last_date": state["last_date"],
+        })
+    return n_alerts
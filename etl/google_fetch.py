@@ -1,10 +1,10 @@
 import os
 from datetime import date
 
-def fetch_google_daily(client_id: str, start: date, end: date):
+def fetch_google_daily(client_id: str, start: date, end: date, account_id: str | None = None):
     dev_token = os.getenv("GOOGLE_ADS_DEVELOPER_TOKEN")
     refresh = os.getenv("GOOGLE_ADS_REFRESH_TOKEN")
-    customer_id = os.getenv("GOOGLE_ADS_CUSTOMER_ID")
+    customer_id = account_id or os.getenv("GOOGLE_ADS_CUSTOMER_ID")
 
     # Se não tiver credenciais, não quebra o ETL (retorna vazio)
     if not (dev_token and refresh and customer_id):
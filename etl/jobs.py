@@ -0,0 +1,217 @@
+import os
+from datetime import date, timedelta
+from sqlalchemy import text
+from db import get_engine
+from etl.run_etl import get_fetcher, upsert_rows
+from etl.snapshots import refresh_snapshots
+
+# Quantas contas de cada plataforma podem sincronizar ao mesmo tempo (somando todos os workers).
+# Sobrescreve via env: ETL_MAX_CONCURRENCY_META, ETL_MAX_CONCURRENCY_GOOGLE
+DEFAULT_CONCURRENCY = {"meta": 2, "google": 1}
+
+PRIORITY_TODAY = 0
+PRIORITY_BACKFILL = 10
+BACKFILL_DAYS = 14
+
+MAX_ATTEMPTS = 3
+RETRY_DELAY_SECONDS = 300
+JOB_TIMEOUT_MINUTES = 30
+# Histórico de jobs terminados (sobrescreve via env ETL_JOBS_RETENTION_DAYS)
+JOBS_RETENTION_DAYS = int(os.getenv("ETL_JOBS_RETENTION_DAYS", "7"))
+
+def platform_concurrency(platform: str) -> int:
+    env = os.getenv(f"ETL_MAX_CONCURRENCY_{platform.upper()}")
+    return int(env) if env else DEFAULT_CONCURRENCY.get(platform, 1)
+
+# ---------- Enfileirar ----------
+ENQUEUE_SQL = """
+insert into etl_jobs (client_id, platform, account_id, start_date, end_date, priority)
+select client_id, platform, account_id, :start, :end, :priority
+from ad_accounts
+on conflict (platform, account_id, start_date, end_date) where status in ('queued','running')
+do nothing;
+"""
+
+def enqueue_today(today: date | None = None) -> int:
+    """Um job por conta só com o dia de hoje (prioridade máxima)."""
+    today = today or date.today()
+    with get_engine().begin() as conn:
+        res = conn.execute(text(ENQUEUE_SQL), {"start": today, "end": today, "priority": PRIORITY_TODAY})
+        return res.rowcount
+
+def enqueue_backfill(today: date | None = None, days: int = BACKFILL_DAYS) -> int:
+    """Um job por conta com os últimos `days` dias fechados (ontem para trás)."""
+    today = today or date.today()
+    params = {
+        "start": today - timedelta(days=days),
+        "end": today - timedelta(days=1),
+        "priority": PRIORITY_BACKFILL,
+    }
+    with get_engine().begin() as conn:
+        res = conn.execute(text(ENQUEUE_SQL), params)
+        return res.rowcount
+
+STALE_SQL = """
+select id, platform, account_id
+from etl_jobs
+where status = 'running'
+  and started_at < now() - make_interval(mins => :timeout)
+for update skip locked;
+"""
+
+REQUEUE_SQL = """
+update etl_jobs
+set status = case when attempts >= :max_attempts then 'failed' else 'queued' end,
+    run_after = now(),
+    finished_at = case when attempts >= :max_attempts then now() end,
+    error = case when attempts >= :max_attempts
+                 then 'worker morreu no meio do job em todas as tentativas'
+                 else error end
+where id = :id;
+"""
+
+def requeue_stale(timeout_minutes: int = JOB_TIMEOUT_MINUTES) -> int:
+    """
+    Devolve para a fila jobs 'running' de workers que morreram no meio.
+    Job que já derrubou o worker MAX_ATTEMPTS vezes vira 'failed' (não volta para sempre).
+
+    Tempo sozinho não basta (conta lenta é justamente o caso que a fila resolve): o job
+    só é considerado órfão se o advisory lock da conta estiver livre, ou seja, nenhum
+    worker vivo segura aquela conta. O lock fica com a gente até o update, para ninguém
+    reservar a conta no meio.
+    """
+    n = 0
+    with get_engine().begin() as conn:
+        for job in conn.execute(text(STALE_SQL), {"timeout": timeout_minutes}).mappings().all():
+            account_lock = ("etl:account", f"{job['platform']}:{job['account_id']}")
+            if not _try_lock(conn, *account_lock):
+                continue  # worker vivo (ainda rodando)
+            try:
+                conn.execute(text(REQUEUE_SQL), {"id": job["id"], "max_attempts": MAX_ATTEMPTS})
+                n += 1
+            finally:
+                _unlock(conn, *account_lock)
+    return n
+
+def purge_finished(retention_days: int = JOBS_RETENTION_DAYS) -> int:
+    """Apaga jobs 'done'/'failed' terminados há mais de `retention_days` dias."""
+    with get_engine().begin() as conn:
+        res = conn.execute(text("""
+            delete from etl_jobs
+            where status in ('done','failed')
+              and finished_at < now() - make_interval(days => :days)
+        """), {"days": retention_days})
+        return res.rowcount
+
+# ---------- Consumir ----------
+CANDIDATES_SQL = """
+select id, client_id, platform, account_id, start_date, end_date, attempts
+from etl_jobs
+where status = 'queued' and run_after <= now()
+  and platform = any(:platforms)
+order by priority, run_after, id
+limit :batch
+for update skip locked;
+"""
+
+def _try_lock(lock_conn, ns: str, key: str) -> bool:
+    return bool(lock_conn.execute(
+        text("select pg_try_advisory_lock(hashtext(:ns), hashtext(:key))"),
+        {"ns": ns, "key": key},
+    ).scalar())
+
+def _unlock(lock_conn, ns: str, key: str) -> None:
+    lock_conn.execute(
+        text("select pg_advisory_unlock(hashtext(:ns), hashtext(:key))"),
+        {"ns": ns, "key": key},
+    )
+
+def _acquire_slot(lock_conn, platform: str) -> tuple | None:
+    """Pega uma das N vagas da plataforma (advisory lock de sessão)."""
+    for slot in range(platform_concurrency(platform)):
+        lock = ("etl:platform", f"{platform}:{slot}")
+        if _try_lock(lock_conn, *lock):
+            return lock
+    return None
+
+def release_locks(lock_conn, locks: list) -> None:
+    for ns, key in locks:
+        _unlock(lock_conn, ns, key)
+
+def claim_job(lock_conn, batch: int = 20):
+    """
+    Reserva o próximo job respeitando prioridade, o limite por plataforma
+    e a exclusividade por conta (dois jobs da mesma conta nunca rodam juntos).
+
+    Primeiro reserva uma vaga em cada plataforma que ainda tem espaço e só então
+    busca candidatos dessas plataformas: uma plataforma lotada não trava as outras.
+
+    `lock_conn` é uma conexão em autocommit que segura os advisory locks
+    enquanto o job roda. Retorna (job, locks) ou None.
+    """
+    slots = {}
+    for platform in DEFAULT_CONCURRENCY:
+        lock = _acquire_slot(lock_conn, platform)
+        if lock is not None:
+            slots[platform] = lock
+    if not slots:
+        return None
+
+    try:
+        with get_engine().begin() as conn:
+            candidates = conn.execute(
+                text(CANDIDATES_SQL), {"batch": batch, "platforms": list(slots)}
+            ).mappings().all()
+            for job in candidates:
+                account_lock = ("etl:account", f"{job['platform']}:{job['account_id']}")
+                if not _try_lock(lock_conn, *account_lock):
+                    continue
+                try:
+                    conn.execute(text("""
+                        update etl_jobs
+                        set status = 'running', started_at = now(), attempts = attempts + 1
+                        where id = :id
+                    """), {"id": job["id"]})
+                except Exception:
+                    release_locks(lock_conn, [account_lock])
+                    raise
+                return dict(job), [slots.pop(job["platform"]), account_lock]
+        return None
+    finally:
+        # Vagas das plataformas que não foram usadas
+        release_locks(lock_conn, list(slots.values()))
+
+def run_job(job: dict) -> int:
+    fetch = get_fetcher(job["platform"])
+    rows = fetch(str(job["client_id"]), job["start_date"], job["end_date"], account_id=job["account_id"])
+    upsert_rows(rows)
+    refresh_snapshots([str(job["client_id"])])
+    return len(rows)
+
+def finish_job(job: dict, error: Exception | None = None) -> None:
+    if error is None:
+        sql = """
+            update etl_jobs
+            set status = 'done', finished_at = now(), error = null
+            where id = :id
+        """
+        params = {"id": job["id"]}
+    else:
+        # Backoff linear; depois de MAX_ATTEMPTS desiste
+        attempts = job["attempts"] + 1
+        sql = """
+            update etl_jobs
+            set status = :status,
+                run_after = now() + make_interval(secs => :delay),
+                finished_at = case when :status = 'failed' then now() end,
+                error = :error
+            where id = :id
+        """
+        params = {
+            "id": job["id"],
+            "status": "failed" if attempts >= MAX_ATTEMPTS else "queued",
+            "delay": RETRY_DELAY_SECONDS * attempts,
+            "error": str(error)[:2000],
+        }
+    with get_engine().begin() as conn:
+        conn.execute(text(sql), params)
@@ -33,9 +33,9 @@ def _sum_actions(actions, action_types: list[str]) -> int:
         total += _get_action_value(actions, t)
     return total
 
-def fetch_meta_daily(client_id: str, start: date, end: date):
+def fetch_meta_daily(client_id: str, start: date, end: date, account_id: str | None = None):
     token = os.getenv("META_ACCESS_TOKEN")
-    act = os.getenv("META_AD_ACCOUNT_ID")  # ex: act_123
+    act = account_id or os.getenv("META_AD_ACCOUNT_ID")  # ex: act_123
     if not token or not act:
         return []
 
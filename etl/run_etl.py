@@ -1,35 +1,128 @@
+import importlib
 import os
 from datetime import date, timedelta
-from dotenv import load_dotenv
-from db import exec_sql
-from etl.meta_fetch import fetch_meta_daily
-from etl.google_fetch import fetch_google_daily
-
-load_dotenv()
-
-def upsert_rows(rows):
-    sql = """
-    insert into daily_metrics
-    (date, platform, client_id, account_id, campaign_id, campaign_name,
-     spend, impressions, reach, clicks, leads, conversations, conversions, revenue, updated_at)
-    values
-    (:date, :platform, :client_id, :account_id, :campaign_id, :campaign_name,
-     :spend, :impressions, :reach, :clicks, :leads, :conversations, :conversions, :revenue, now())
-    on conflict (date, platform, client_id, account_id, campaign_id)
-    do update set
-      campaign_name = excluded.campaign_name,
-      spend = excluded.spend,
-      impressions = excluded.impressions,
-      reach = excluded.reach,
-      clicks = excluded.clicks,
-      leads = excluded.leads,
-      conversations = excluded.conversations,
-      conversions = excluded.conversions,
-      revenue = excluded.revenue,
-      updated_at = now();
-    """
+from sqlalchemy import text
+from db import get_engine  # também carrega o .env
+from etl.snapshots import refresh_snapshots
+from etl.alerts import update_alerts
+
+# Fetchers carregados sob demanda: conta só Meta não paga o import do client do Google Ads (e vice-versa)
+FETCHERS = {
+    "meta": "etl.meta_fetch:fetch_meta_daily",
+    "google": "etl.google_fetch:fetch_google_daily",
+}
+
+# Variável de conta usada pelo modo "um cliente só" (ETL_CLIENT_ID)
+ACCOUNT_ENV = {
+    "meta": "META_AD_ACCOUNT_ID",
+    "google": "GOOGLE_ADS_CUSTOMER_ID",
+}
+
+def get_fetcher(platform: str):
+    module_name, func_name = FETCHERS[platform].split(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+CAMPAIGN_UPSERT_SQL = """
+insert into campaigns (client_id, platform, account_id, campaign_id, campaign_name)
+values (:client_id, :platform, :account_id, :campaign_id, :campaign_name)
+on conflict (platform, account_id, campaign_id)
+do update set
+  client_id = excluded.client_id,
+  campaign_name = excluded.campaign_name,
+  updated_at = now()
+where (campaigns.client_id, campaigns.campaign_name)
+  is distinct from (excluded.client_id, excluded.campaign_name)
+returning id;
+"""
+
+# Regra: fatos (e alertas) seguem o client_id da campanha. Quando uma conta muda de
+# cliente, o histórico inteiro da campanha vai junto (não só os dias do ETL atual).
+CAMPAIGN_REASSIGN_SQL = [
+    "update daily_metrics set client_id = :client_id where campaign_key = :campaign_key and client_id <> :client_id",
+    "update alert_stats set client_id = :client_id where campaign_key = :campaign_key and client_id <> :client_id",
+    "update alerts set client_id = :client_id where campaign_key = :campaign_key and client_id <> :client_id",
+]
+
+CAMPAIGN_LOOKUP_SQL = """
+select id from campaigns
+where platform = :platform and account_id = :account_id and campaign_id = :campaign_id;
+"""
+
+METRICS_UPSERT_SQL = """
+insert into daily_metrics
+(date, campaign_key, client_id,
+ spend, impressions, reach, clicks, leads, conversations, conversions, revenue, updated_at)
+values
+(:date, :campaign_key, :client_id,
+ :spend, :impressions, :reach, :clicks, :leads, :conversations, :conversions, :revenue, now())
+on conflict (campaign_key, date)
+do update set
+  client_id = excluded.client_id,
+  spend = excluded.spend,
+  impressions = excluded.impressions,
+  reach = excluded.reach,
+  clicks = excluded.clicks,
+  leads = excluded.leads,
+  conversations = excluded.conversations,
+  conversions = excluded.conversions,
+  revenue = excluded.revenue,
+  updated_at = now()
+where (daily_metrics.client_id,
+       daily_metrics.spend, daily_metrics.impressions, daily_metrics.reach, daily_metrics.clicks,
+       daily_metrics.leads, daily_metrics.conversations, daily_metrics.conversions, daily_metrics.revenue)
+  is distinct from
+      (excluded.client_id,
+       excluded.spend, excluded.impressions, excluded.reach, excluded.clicks,
+       excluded.leads, excluded.conversations, excluded.conversions, excluded.revenue)
+returning campaign_key;
+"""
+
+def _campaign_natural_key(r) -> tuple:
+    return (r["platform"], r["account_id"], r.get("campaign_id") or "")
+
+def upsert_campaigns(conn, rows) -> dict:
+    """Grava cada campanha uma única vez e devolve {(platform, account_id, campaign_id): id}."""
+    keys = {}
     for r in rows:
-        exec_sql(sql, r)
+        nk = _campaign_natural_key(r)
+        if nk in keys:
+            continue
+        params = {
+            "client_id": r["client_id"],
+            "platform": nk[0],
+            "account_id": nk[1],
+            "campaign_id": nk[2],
+            "campaign_name": r.get("campaign_name"),
+        }
+        # Se nome/cliente não mudaram o upsert não retorna linha: busca o id existente
+        campaign_key = conn.execute(text(CAMPAIGN_UPSERT_SQL), params).scalar()
+        if campaign_key is None:
+            campaign_key = conn.execute(text(CAMPAIGN_LOOKUP_SQL), params).scalar_one()
+        else:
+            for sql in CAMPAIGN_REASSIGN_SQL:
+                conn.execute(text(sql), {"client_id": params["client_id"], "campaign_key": campaign_key})
+        keys[nk] = campaign_key
+    return keys
+
+def upsert_rows(rows) -> tuple[int, int]:
+    """
+    Grava as métricas e atualiza os alertas das campanhas gravadas, numa transação só:
+    se os alertas falharem nada fica gravado e o retry refaz tudo.
+    Retorna (linhas novas/alteradas, alertas novos).
+    """
+    if not rows:
+        return 0, 0
+    n_changed = 0
+    with get_engine().begin() as conn:
+        keys = upsert_campaigns(conn, rows)
+        for r in rows:
+            params = {k: v for k, v in r.items()
+                      if k not in ("platform", "account_id", "campaign_id", "campaign_name")}
+            params["campaign_key"] = keys[_campaign_natural_key(r)]
+            if conn.execute(text(METRICS_UPSERT_SQL), params).first() is not None:
+                n_changed += 1
+        n_alerts = update_alerts(conn, set(keys.values()))
+    return n_changed, n_alerts
 
 def main():
     end = date.today()
@@ -39,11 +132,17 @@ def main():
     if not client_id:
         raise RuntimeError("Defina ETL_CLIENT_ID no .env para rodar o ETL para um cliente específico.")
 
-    meta_rows = fetch_meta_daily(client_id, start, end)
-    google_rows = fetch_google_daily(client_id, start, end)
+    rows = []
+    for platform, env in ACCOUNT_ENV.items():
+        if os.getenv(env):
+            rows += get_fetcher(platform)(client_id, start, end)
+
+    n_changed, n_alerts = upsert_rows(rows)
+    print(f"OK: gravou {len(rows)} linhas ({n_changed} novas/alteradas)")
+    if n_alerts:
+        print(f"ALERTAS: {n_alerts} novos")
 
-    upsert_rows(meta_rows + google_rows)
-    print(f"OK: gravou {len(meta_rows) + len(google_rows)} linhas")
+    refresh_snapshots([client_id])
 
 if __name__ == "__main__":
     main()
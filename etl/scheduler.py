@@ -0,0 +1,153 @@
+"""
+Serviço do ETL: enfileira jobs por conta (tabela `etl_jobs`) e sobe N workers que drenam a fila.
+
+Uso:
+    python -m etl.scheduler                 # scheduler + workers
+    python -m etl.scheduler --workers 0     # só enfileira (workers em outras máquinas)
+    python -m etl.scheduler --worker-only   # só drena a fila
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from sqlalchemy import text
+from db import get_engine  # também carrega o .env
+from etl import jobs
+
+# Espera após erro inesperado (banco fora, conexão caiu...): dobra a cada falha seguida
+BACKOFF_START_SECONDS = 5
+BACKOFF_MAX_SECONDS = 300
+# De quanto em quanto tempo o scheduler confere se os workers estão vivos
+TICK_SECONDS = 10
+
+def _backoff(failures: int) -> float:
+    return min(BACKOFF_START_SECONDS * 2 ** (failures - 1), BACKOFF_MAX_SECONDS)
+
+def _work_once(lock_conn, poll_seconds: float) -> None:
+    claimed = jobs.claim_job(lock_conn)
+    if claimed is None:
+        time.sleep(poll_seconds)
+        return
+
+    job, locks = claimed
+    try:
+        n = jobs.run_job(job)
+    except Exception as e:
+        jobs.finish_job(job, e)
+        print(f"ERRO job {job['id']} ({job['platform']} {job['account_id']}): {e}")
+    else:
+        jobs.finish_job(job)
+        print(f"OK job {job['id']} ({job['platform']} {job['account_id']} "
+              f"{job['start_date']}..{job['end_date']}): {n} linhas")
+    finally:
+        jobs.release_locks(lock_conn, locks)
+
+def run_worker(poll_seconds: float = 5.0) -> None:
+    """Loop de um worker: reserva um job, roda, marca como feito/falho, repete."""
+    lock_conn = None
+    failures = 0
+    while True:
+        try:
+            if lock_conn is None:
+                lock_conn = get_engine().connect().execution_options(isolation_level="AUTOCOMMIT")
+            _work_once(lock_conn, poll_seconds)
+            failures = 0
+        except Exception as e:
+            # Fora do job (claim/finish/conexão): descarta a conexão (solta os locks) e tenta de novo.
+            # Um job que ficou 'running' volta para a fila pelo requeue_stale.
+            failures += 1
+            wait = _backoff(failures)
+            print(f"ERRO worker: {e} (nova tentativa em {wait:.0f}s)")
+            if lock_conn is not None:
+                try:
+                    lock_conn.close()
+                except Exception:
+                    pass
+                lock_conn = None
+            time.sleep(wait)
+
+def run_scheduler(interval_seconds: int, backfill_every_seconds: int, on_tick=None) -> None:
+    """
+    Hoje a cada `interval_seconds`; backfill dos últimos dias a cada `backfill_every_seconds`.
+    `on_tick` roda a cada TICK_SECONDS (o main usa para reviver workers mortos).
+    """
+    # Só um scheduler enfileira por vez (os workers podem ser vários).
+    # Se essa conexão cair o lock se perde, mas enfileirar em dobro é inofensivo (índice único).
+    lock_conn = get_engine().connect().execution_options(isolation_level="AUTOCOMMIT")
+    got = lock_conn.execute(text("select pg_try_advisory_lock(hashtext('etl:scheduler'))")).scalar()
+    if not got:
+        lock_conn.close()
+        raise RuntimeError("Já existe outro scheduler do ETL rodando.")
+
+    last_enqueue = None
+    last_backfill = None
+    failures = 0
+    try:
+        while True:
+            if on_tick is not None:
+                on_tick()
+
+            now = time.monotonic()
+            if last_enqueue is None or now - last_enqueue >= interval_seconds:
+                try:
+                    jobs.requeue_stale()
+                    n = jobs.enqueue_today()
+                    if last_backfill is None or now - last_backfill >= backfill_every_seconds:
+                        n += jobs.enqueue_backfill()
+                        purged = jobs.purge_finished()
+                        if purged:
+                            print(f"Apagou {purged} jobs antigos")
+                        last_backfill = now
+                    last_enqueue = now
+                    failures = 0
+                    if n:
+                        print(f"Enfileirou {n} jobs")
+                except Exception as e:
+                    failures += 1
+                    wait = _backoff(failures)
+                    print(f"ERRO scheduler: {e} (nova tentativa em {wait:.0f}s)")
+                    time.sleep(wait)
+                    continue
+
+            time.sleep(TICK_SECONDS)
+    finally:
+        lock_conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Scheduler + workers do ETL")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("ETL_WORKERS", "2")))
+    parser.add_argument("--interval", type=int, default=int(os.getenv("ETL_INTERVAL_SECONDS", "300")))
+    parser.add_argument("--backfill-every", type=int,
+                        default=int(os.getenv("ETL_BACKFILL_EVERY_SECONDS", "3600")))
+    parser.add_argument("--worker-only", action="store_true")
+    args = parser.parse_args()
+
+    if args.worker_only:
+        run_worker()
+        return
+
+    # spawn: cada processo cria o próprio engine/pool (nada de conexão herdada via fork)
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=run_worker, daemon=True) for _ in range(args.workers)]
+    for p in procs:
+        p.start()
+
+    def revive_workers():
+        for i, p in enumerate(procs):
+            if not p.is_alive():
+                print(f"Worker {i} morreu (exit {p.exitcode}); subindo outro")
+                procs[i] = ctx.Process(target=run_worker, daemon=True)
+                procs[i].start()
+
+    try:
+        run_scheduler(args.interval, args.backfill_every, on_tick=revive_workers)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.join()
+
+if __name__ == "__main__":
+    main()
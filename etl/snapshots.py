@@ -0,0 +1,112 @@
+import json
+from datetime import timedelta
+from sqlalchemy import text
+from db import get_engine
+from etl.alerts import RECENT_ALERTS_SQL, RECENT_WINDOW_DAYS
+
+# Mesma janela padrão do app.py: últimos 7 dias até a última data com dados
+DEFAULT_DAYS = 7
+
+METRICS = ["spend", "impressions", "clicks", "leads", "conversations", "conversions"]
+
+_SUMS = ", ".join(f"coalesce(sum(m.{c}), 0) as {c}" for c in METRICS)
+
+DAILY_SQL = f"""
+select m.date, c.platform, {_SUMS}
+from daily_metrics m
+join campaigns c on c.id = m.campaign_key
+where m.client_id = :client_id
+  and m.date between :start and :end
+group by m.date, c.platform
+order by m.date, c.platform;
+"""
+
+TOTALS_SQL = f"""
+select {_SUMS}
+from daily_metrics m
+where m.client_id = :client_id
+  and m.date between :start and :end;
+"""
+
+UPSERT_SQL = """
+insert into report_snapshots (client_id, payload, generated_at)
+values (:client_id, cast(:payload as jsonb), now())
+on conflict (client_id)
+do update set payload = excluded.payload, generated_at = now();
+"""
+
+def _num(col: str, v):
+    # sum() vem como Decimal; no JSON basta float (spend) ou int (contagens)
+    return float(v) if col == "spend" else int(v)
+
+def build_snapshot(conn, client_id: str) -> dict | None:
+    """
+    Monta o payload da visão padrão de um cliente: série diária por plataforma
+    (base dos KPIs, gráfico e quebra por plataforma) + totais do período anterior
+    (base dos deltas). Retorna None se o cliente não tem dados.
+    """
+    bounds = conn.execute(
+        text("select min(date), max(date) from daily_metrics where client_id = :client_id"),
+        {"client_id": client_id},
+    ).one()
+    min_date, max_date = bounds
+    if max_date is None:
+        return None
+
+    end = max_date
+    start = end - timedelta(days=DEFAULT_DAYS - 1)
+    prev_end = start - timedelta(days=1)
+    prev_start = prev_end - timedelta(days=DEFAULT_DAYS - 1)
+
+    rows = conn.execute(text(DAILY_SQL), {"client_id": client_id, "start": start, "end": end}).all()
+    prev = conn.execute(text(TOTALS_SQL), {"client_id": client_id, "start": prev_start, "end": prev_end}).one()
+
+    # Colunar: bem menor que lista de dicts e vira DataFrame direto no app
+    daily = {"date": [r.date.isoformat() for r in rows], "platform": [r.platform for r in rows]}
+    for c in METRICS:
+        daily[c] = [_num(c, getattr(r, c)) for r in rows]
+
+    # Alertas não dependem dos filtros: o app usa estes em qualquer visão
+    recent = conn.execute(text(RECENT_ALERTS_SQL), {
+        "client_id": client_id,
+        "since": max_date - timedelta(days=RECENT_WINDOW_DAYS - 1),
+    }).all()
+    alerts = [
+        {
+            "date": a.date.isoformat(), "platform": a.platform, "campaign_name": a.campaign_name,
+            "metric": a.metric, "value": a.value, "expected": a.expected,
+        }
+        for a in recent
+    ]
+
+    return {
+        "min_date": min_date.isoformat(),
+        "max_date": max_date.isoformat(),
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "daily": daily,
+        "prev": {c: _num(c, getattr(prev, c)) for c in METRICS},
+        "alerts": alerts,
+    }
+
+def refresh_snapshots(client_ids) -> int:
+    """Recalcula e grava o snapshot de cada cliente. Retorna quantos foram gravados."""
+    n = 0
+    for client_id in sorted(set(client_ids)):
+        # Uma transação por cliente, serializada por advisory lock: jobs de contas diferentes
+        # do mesmo cliente rodam em paralelo, e sem isso um snapshot montado antes dos fatos
+        # do outro job podia ser gravado por último (e ficar valendo velho).
+        with get_engine().begin() as conn:
+            conn.execute(
+                text("select pg_advisory_xact_lock(hashtext('etl:snapshot'), hashtext(:client_id))"),
+                {"client_id": client_id},
+            )
+            payload = build_snapshot(conn, client_id)
+            if payload is None:
+                continue
+            conn.execute(text(UPSERT_SQL), {
+                "client_id": client_id,
+                "payload": json.dumps(payload, separators=(",", ":")),
+            })
+            n += 1
+    return n
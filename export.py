@@ -0,0 +1,157 @@
+"""
+Exportação dos dados do relatório (mesmos filtros do app.py) em CSV ou Parquet.
+
+Lê `daily_metrics` com cursor do lado do servidor e grava em blocos:
+a memória fica constante, não importa o tamanho do período.
+
+Uso:
+    python export.py --client-id <uuid> --start 2024-01-01 --end 2024-03-31 --out dados.csv
+    python export.py --client-id <uuid> --start 2024-01-01 --end 2024-03-31 --format parquet --out dados.parquet
+"""
+import argparse
+import csv
+import io
+import sys
+from contextlib import closing
+from datetime import date
+from sqlalchemy import text
+from db import get_engine
+
+CHUNK_SIZE = 5000
+
+COLUMNS = [
+    "date", "platform", "account_id", "campaign_id", "campaign_name",
+    "spend", "impressions", "reach", "clicks",
+    "leads", "conversations", "conversions", "revenue",
+]
+
+FORMATS = ("csv", "parquet")
+
+def build_query(client_id: str, start: date, end: date,
+                platforms: list[str] | None = None, search: str = "") -> tuple[str, dict]:
+    """Mesma lógica de filtros do app.py (cliente, período, plataformas, busca por campanha)."""
+    params = {"client_id": client_id, "start": start, "end": end}
+    platform_filter = ""
+    if platforms:
+        platform_filter = "and c.platform = any(:platforms)"
+        params["platforms"] = list(platforms)
+
+    campaign_filter = ""
+    if search.strip():
+        campaign_filter = "and lower(coalesce(c.campaign_name,'')) like :q"
+        params["q"] = f"%{search.strip().lower()}%"
+
+    sql = f"""
+        select
+          m.date, c.platform, c.account_id, c.campaign_id, c.campaign_name,
+          m.spend, m.impressions, m.reach, m.clicks,
+          m.leads, m.conversations, m.conversions, m.revenue
+        from daily_metrics m
+        join campaigns c on c.id = m.campaign_key
+        where m.client_id = :client_id
+          and m.date between :start and :end
+          {platform_filter}
+          {campaign_filter}
+        order by m.date asc, c.platform, c.campaign_id
+    """
+    return sql, params
+
+def iter_chunks(sql: str, params: dict, chunk_size: int = CHUNK_SIZE):
+    """Gera listas de até `chunk_size` linhas, via cursor do lado do servidor."""
+    with get_engine().connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(text(sql), params)
+        for part in result.partitions():
+            yield part
+
+def write_csv(fileobj, chunks) -> int:
+    """`fileobj` em modo texto. Retorna quantas linhas foram escritas."""
+    writer = csv.writer(fileobj)
+    writer.writerow(COLUMNS)
+    n = 0
+    for part in chunks:
+        writer.writerows(part)
+        n += len(part)
+    return n
+
+def write_parquet(fileobj, chunks) -> int:
+    """Um row group por bloco. `fileobj` binário ou caminho. Retorna quantas linhas."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Exportar Parquet precisa do pyarrow (pip install pyarrow)") from e
+
+    schema = pa.schema([
+        ("date", pa.date32()),
+        ("platform", pa.string()),
+        ("account_id", pa.string()),
+        ("campaign_id", pa.string()),
+        ("campaign_name", pa.string()),
+        ("spend", pa.float64()),
+        ("impressions", pa.int64()),
+        ("reach", pa.int64()),
+        ("clicks", pa.int64()),
+        ("leads", pa.int64()),
+        ("conversations", pa.int64()),
+        ("conversions", pa.int64()),
+        ("revenue", pa.float64()),
+    ])
+    money = {"spend", "revenue"}
+
+    n = 0
+    with pq.ParquetWriter(fileobj, schema) as writer:
+        for part in chunks:
+            cols = list(zip(*part))
+            data = {
+                name: [float(v) if v is not None else None for v in col] if name in money else list(col)
+                for name, col in zip(COLUMNS, cols)
+            }
+            writer.write_table(pa.Table.from_pydict(data, schema=schema))
+            n += len(part)
+    return n
+
+def export(fileobj, fmt: str, client_id: str, start: date, end: date,
+           platforms: list[str] | None = None, search: str = "") -> int:
+    """Exporta para um arquivo binário aberto. Retorna quantas linhas foram escritas."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato inválido: {fmt} (use {', '.join(FORMATS)})")
+
+    sql, params = build_query(client_id, start, end, platforms, search)
+    # closing: se o writer falhar no meio, fecha o cursor do servidor e devolve a conexão ao pool
+    with closing(iter_chunks(sql, params)) as chunks:
+        if fmt == "parquet":
+            return write_parquet(fileobj, chunks)
+
+        out = io.TextIOWrapper(fileobj, encoding="utf-8", newline="")
+        try:
+            return write_csv(out, chunks)
+        finally:
+            out.flush()
+            out.detach()  # não fecha o arquivo de quem chamou
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta dados do relatório em CSV/Parquet")
+    parser.add_argument("--client-id", required=True)
+    parser.add_argument("--start", required=True, type=date.fromisoformat)
+    parser.add_argument("--end", required=True, type=date.fromisoformat)
+    parser.add_argument("--platform", action="append", choices=["meta", "google"],
+                        help="repita para mais de uma (padrão: todas)")
+    parser.add_argument("--search", default="", help="campanha contém")
+    parser.add_argument("--format", default="csv", choices=FORMATS)
+    parser.add_argument("--out", default="-", help="arquivo de saída ('-' = stdout)")
+    args = parser.parse_args()
+    if args.format == "parquet" and args.out == "-":
+        parser.error("Parquet precisa de --out (o writer não grava em stdout)")
+
+    filters = dict(client_id=args.client_id, start=args.start, end=args.end,
+                   platforms=args.platform, search=args.search)
+
+    if args.out == "-":
+        n = export(sys.stdout.buffer, args.format, **filters)
+    else:
+        with open(args.out, "wb") as f:
+            n = export(f, args.format, **filters)
+    print(f"OK: exportou {n} linhas", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
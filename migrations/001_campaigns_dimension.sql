@@ -0,0 +1,89 @@
+-- ============================
+-- Migração: dimensão `campaigns` + chaves inteiras em `daily_metrics`
+-- Para bancos criados com a versão anterior do schema.sql.
+-- Rode uma vez (ex: no SQL Editor do Supabase). Tudo numa transação.
+-- ============================
+
+begin;
+
+create table if not exists campaigns (
+  id bigint generated always as identity primary key,
+  client_id uuid not null references clients(id) on delete cascade,
+  platform text not null check (platform in ('meta','google')),
+  account_id text not null,
+  campaign_id text not null,
+  campaign_name text,
+  updated_at timestamptz not null default now(),
+  unique (platform, account_id, campaign_id)
+);
+
+create index if not exists idx_campaigns_client_platform
+on campaigns (client_id, platform);
+
+-- Uma linha por campanha, com o nome mais recente visto no ETL
+insert into campaigns (client_id, platform, account_id, campaign_id, campaign_name, updated_at)
+select distinct on (platform, account_id, coalesce(campaign_id, ''))
+  client_id, platform, account_id, coalesce(campaign_id, ''), campaign_name, updated_at
+from daily_metrics
+order by platform, account_id, coalesce(campaign_id, ''), updated_at desc
+on conflict (platform, account_id, campaign_id) do nothing;
+
+create table daily_metrics_new (
+  date date not null,
+  campaign_key bigint not null references campaigns(id) on delete cascade,
+  client_id uuid not null references clients(id) on delete cascade,
+
+  spend numeric(12,2) default 0,
+  impressions bigint default 0,
+  reach bigint default 0,
+  clicks bigint default 0,
+
+  leads bigint default 0,
+  conversations bigint default 0,
+  conversions bigint default 0,
+  revenue numeric(12,2) default 0,
+
+  updated_at timestamptz not null default now(),
+  primary key (campaign_key, date)
+);
+
+-- A chave antiga aceitava várias linhas por (campanha, dia): campaign_id nulo
+-- (nulls não colidem no unique) ou a mesma campanha sob client_ids diferentes.
+-- Fica a linha gravada por último em cada (campanha, dia).
+insert into daily_metrics_new
+  (date, campaign_key, client_id, spend, impressions, reach, clicks,
+   leads, conversations, conversions, revenue, updated_at)
+select distinct on (c.id, m.date)
+  m.date, c.id, c.client_id, m.spend, m.impressions, m.reach, m.clicks,
+  m.leads, m.conversations, m.conversions, m.revenue, m.updated_at
+from daily_metrics m
+join campaigns c
+  on c.platform = m.platform
+ and c.account_id = m.account_id
+ and c.campaign_id = coalesce(m.campaign_id, '')
+order by c.id, m.date, m.updated_at desc;
+
+alter table daily_metrics rename to daily_metrics_old;
+alter table daily_metrics_new rename to daily_metrics;
+
+create index if not exists idx_daily_metrics_client_date_v2
+on daily_metrics (client_id, date);
+
+-- Portfólio (todos os clientes num intervalo de datas). Se o schema.sql novo rodou antes,
+-- idx_daily_metrics_date ficou na tabela antiga e some junto com ela.
+create index if not exists idx_daily_metrics_date_v2
+on daily_metrics (date);
+
+commit;
+
+-- Conferir antes de apagar a tabela antiga (a nova pode ter menos linhas: duplicadas descartadas):
+--   select count(*) from daily_metrics_old;
+--   select count(*) from daily_metrics;
+--
+-- Comparação de tamanho/tempo de scan entre os dois formatos: scripts/bench_campaigns_layout.py
+--
+-- Depois:
+--   drop table daily_metrics_old;
+--   alter index idx_daily_metrics_client_date_v2 rename to idx_daily_metrics_client_date;
+--   drop index if exists idx_daily_metrics_date;  -- só se tiver sido criado na tabela antiga
+--   alter index idx_daily_metrics_date_v2 rename to idx_daily_metrics_date;
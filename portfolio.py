@@ -0,0 +1,100 @@
+"""
+Portfólio: todos os clientes x período anterior numa única query (GROUPING SETS).
+
+Uso:
+    python portfolio.py                                   # últimos 7 dias até ontem
+    python portfolio.py --start 2024-03-01 --end 2024-03-31
+"""
+import argparse
+from datetime import date, timedelta
+from sqlalchemy import text
+from db import get_engine
+
+PORTFOLIO_SQL = """
+with agg as (
+  select
+    m.client_id,
+    c.platform,
+    grouping(m.client_id) as g_client,
+    grouping(c.platform) as g_platform,
+    coalesce(sum(m.spend) filter (where m.date >= :start), 0) as spend,
+    coalesce(sum(m.clicks) filter (where m.date >= :start), 0) as clicks,
+    coalesce(sum(m.conversations) filter (where m.date >= :start), 0) as conversations,
+    coalesce(sum(m.spend) filter (where m.date < :start), 0) as prev_spend,
+    coalesce(sum(m.clicks) filter (where m.date < :start), 0) as prev_clicks,
+    coalesce(sum(m.conversations) filter (where m.date < :start), 0) as prev_conversations
+  from daily_metrics m
+  join campaigns c on c.id = m.campaign_key
+  where m.date between :prev_start and :end
+  group by grouping sets ((m.client_id, c.platform), (m.client_id), ())
+),
+kpis as (
+  select
+    agg.*,
+    spend / nullif(clicks, 0) as cpc,
+    prev_spend / nullif(prev_clicks, 0) as prev_cpc,
+    spend / nullif(conversations, 0) as cpconv,
+    prev_spend / nullif(prev_conversations, 0) as prev_cpconv
+  from agg
+)
+select
+  case when k.g_client = 1 then 'total' when k.g_platform = 1 then 'client' else 'platform' end as level,
+  k.client_id,
+  cl.name as client_name,
+  k.platform,
+  k.spend, k.prev_spend,
+  (k.spend - k.prev_spend) / nullif(k.prev_spend, 0) * 100 as d_spend,
+  k.cpc, k.prev_cpc,
+  (k.cpc - k.prev_cpc) / nullif(k.prev_cpc, 0) * 100 as d_cpc,
+  k.cpconv, k.prev_cpconv,
+  (k.cpconv - k.prev_cpconv) / nullif(k.prev_cpconv, 0) * 100 as d_cpconv
+from kpis k
+left join clients cl on cl.id = k.client_id
+order by k.g_client desc, cl.name, k.client_id, k.g_platform desc, k.platform;
+"""
+
+DATE_BOUNDS_SQL = "select min(date) as min_date, max(date) as max_date from daily_metrics"
+
+def portfolio_query(start: date, end: date) -> tuple[str, dict]:
+    """SQL + params; o período anterior tem o mesmo tamanho e termina na véspera de `start`."""
+    days = (end - start).days + 1
+    prev_start = start - timedelta(days=days)
+    return PORTFOLIO_SQL, {"start": start, "end": end, "prev_start": prev_start}
+
+def fetch_portfolio(start: date, end: date) -> list[dict]:
+    sql, params = portfolio_query(start, end)
+    with get_engine().connect() as conn:
+        return [dict(r) for r in conn.execute(text(sql), params).mappings()]
+
+def _fmt_money(v) -> str:
+    return "—" if v is None else f"{float(v):,.2f}"
+
+def _fmt_delta(v) -> str:
+    return "—" if v is None else f"{float(v):+.1f}%"
+
+def main():
+    parser = argparse.ArgumentParser(description="Portfólio de clientes vs período anterior")
+    yesterday = date.today() - timedelta(days=1)
+    parser.add_argument("--start", type=date.fromisoformat, default=yesterday - timedelta(days=6))
+    parser.add_argument("--end", type=date.fromisoformat, default=yesterday)
+    args = parser.parse_args()
+
+    print(f"Período {args.start} a {args.end}")
+    header = f"{'Cliente':<30} {'Plataforma':<10} {'Investimento':>14} {'Δ':>8} {'CPC':>8} {'Δ':>8} {'Custo/Conv':>10} {'Δ':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in fetch_portfolio(args.start, args.end):
+        if r["level"] == "total":
+            name, plat = "TOTAL", ""
+        elif r["level"] == "client":
+            name, plat = r["client_name"] or str(r["client_id"]), ""
+        else:
+            name, plat = "", r["platform"]
+        print(
+            f"{name[:30]:<30} {plat:<10} {_fmt_money(r['spend']):>14} {_fmt_delta(r['d_spend']):>8} "
+            f"{_fmt_money(r['cpc']):>8} {_fmt_delta(r['d_cpc']):>8} "
+            f"{_fmt_money(r['cpconv']):>10} {_fmt_delta(r['d_cpconv']):>8}"
+        )
+
+if __name__ == "__main__":
+    main()
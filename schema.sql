@@ -22,15 +22,27 @@ create table if not exists ad_accounts (
   unique (platform, account_id)
 );
 
--- MÉTRICAS DIÁRIAS (agregado por dia + campanha)
-create table if not exists daily_metrics (
+-- CAMPANHAS (dimensão: nome/ids externos gravados uma vez por campanha)
+create table if not exists campaigns (
   id bigint generated always as identity primary key,
-  date date not null,
-  platform text not null check (platform in ('meta','google')),
   client_id uuid not null references clients(id) on delete cascade,
+  platform text not null check (platform in ('meta','google')),
   account_id text not null,
-  campaign_id text,
+  campaign_id text not null,
   campaign_name text,
+  updated_at timestamptz not null default now(),
+  unique (platform, account_id, campaign_id)
+);
+
+create index if not exists idx_campaigns_client_platform
+on campaigns (client_id, platform);
+
+-- MÉTRICAS DIÁRIAS (agregado por dia + campanha)
+-- Só chaves inteiras + métricas; plataforma/conta/nome ficam em `campaigns`.
+create table if not exists daily_metrics (
+  date date not null,
+  campaign_key bigint not null references campaigns(id) on delete cascade,
+  client_id uuid not null references clients(id) on delete cascade,
 
   spend numeric(12,2) default 0,
   impressions bigint default 0,
@@ -43,11 +55,81 @@ create table if not exists daily_metrics (
   revenue numeric(12,2) default 0,
 
   updated_at timestamptz not null default now(),
-  unique (date, platform, client_id, account_id, campaign_id)
+  primary key (campaign_key, date)
 );
 
 create index if not exists idx_daily_metrics_client_date
 on daily_metrics (client_id, date);
 
-create index if not exists idx_daily_metrics_platform_date
-on daily_metrics (platform, date);
+-- Portfólio (todos os clientes num intervalo de datas)
+create index if not exists idx_daily_metrics_date
+on daily_metrics (date);
+
+-- FILA DO ETL (um job = uma conta + intervalo de datas)
+create table if not exists etl_jobs (
+  id bigint generated always as identity primary key,
+  client_id uuid not null references clients(id) on delete cascade,
+  platform text not null check (platform in ('meta','google')),
+  account_id text not null,
+  start_date date not null,
+  end_date date not null,
+  priority int not null default 100,  -- menor = antes (hoje = 0)
+  status text not null default 'queued' check (status in ('queued','running','done','failed')),
+  attempts int not null default 0,
+  run_after timestamptz not null default now(),
+  started_at timestamptz,
+  finished_at timestamptz,
+  error text,
+  created_at timestamptz not null default now()
+);
+
+-- Não enfileira o mesmo job duas vezes enquanto ele estiver pendente/rodando
+create unique index if not exists uq_etl_jobs_pending
+on etl_jobs (platform, account_id, start_date, end_date)
+where status in ('queued','running');
+
+create index if not exists idx_etl_jobs_queue
+on etl_jobs (priority, run_after, id)
+where status = 'queued';
+
+-- Limpeza do histórico (scheduler apaga terminados há mais de ETL_JOBS_RETENTION_DAYS)
+create index if not exists idx_etl_jobs_finished
+on etl_jobs (finished_at)
+where status in ('done','failed');
+
+-- SNAPSHOT DA VISÃO PADRÃO (últimos 7 dias) por cliente, gerado pelo ETL
+create table if not exists report_snapshots (
+  client_id uuid primary key references clients(id) on delete cascade,
+  payload jsonb not null,
+  generated_at timestamptz not null default now()
+);
+
+-- ESTATÍSTICAS MÓVEIS POR CAMPANHA (EWMA) para os alertas; cada dia fechado entra uma vez (last_date)
+create table if not exists alert_stats (
+  campaign_key bigint not null references campaigns(id) on delete cascade,
+  metric text not null check (metric in ('spend','cpconv')),
+  client_id uuid not null references clients(id) on delete cascade,
+  n int not null default 0,
+  mean double precision not null default 0,
+  var double precision not null default 0,
+  last_date date not null,
+  updated_at timestamptz not null default now(),
+  primary key (campaign_key, metric)
+);
+
+-- ALERTAS (dia fora do padrão da campanha)
+create table if not exists alerts (
+  id bigint generated always as identity primary key,
+  client_id uuid not null references clients(id) on delete cascade,
+  campaign_key bigint not null references campaigns(id) on delete cascade,
+  date date not null,
+  metric text not null check (metric in ('spend','cpconv')),
+  value double precision not null,
+  expected double precision not null,
+  zscore double precision not null,
+  created_at timestamptz not null default now(),
+  unique (campaign_key, date, metric)
+);
+
+create index if not exists idx_alerts_client_date
+on alerts (client_id, date desc);
@@ -0,0 +1,212 @@
+"""
+Benchmark do formato de `daily_metrics`: antigo (texto repetido por linha) vs novo
+(dimensão `campaigns` + chave inteira). Carrega dados sintéticos iguais nos dois
+formatos num schema separado, mede tamanho (tabela + índices) e tempo de scan
+das queries do dashboard com EXPLAIN ANALYZE. Apaga o schema no fim.
+
+Uso (usa o DATABASE_URL do .env; não toca nas tabelas reais):
+    python scripts/bench_campaigns_layout.py
+    python scripts/bench_campaigns_layout.py --clients 100 --campaigns 30 --days 365 --keep
+"""
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import get_engine  # noqa: E402
+
+SCHEMA = "bench_layout"
+
+SETUP_SQL = f"""
+drop schema if exists {SCHEMA} cascade;
+create schema {SCHEMA};
+
+create table {SCHEMA}.camps as
+select
+  cl.client_id,
+  case when k % 2 = 0 then 'meta' else 'google' end as platform,
+  'act_' || (100000 + cl.g) as account_id,
+  (cl.g * 1000 + k)::text as campaign_id,
+  'Campanha ' || k || ' | Mensagens WhatsApp | Cliente ' || cl.g as campaign_name
+from (select gen_random_uuid() as client_id, g from generate_series(1, :clients) g) cl,
+     generate_series(1, :campaigns) k;
+
+-- Formato antigo
+create table {SCHEMA}.daily_metrics_old (
+  id bigint generated always as identity primary key,
+  date date not null,
+  platform text not null,
+  client_id uuid not null,
+  account_id text not null,
+  campaign_id text,
+  campaign_name text,
+  spend numeric(12,2) default 0,
+  impressions bigint default 0,
+  reach bigint default 0,
+  clicks bigint default 0,
+  leads bigint default 0,
+  conversations bigint default 0,
+  conversions bigint default 0,
+  revenue numeric(12,2) default 0,
+  updated_at timestamptz not null default now(),
+  unique (date, platform, client_id, account_id, campaign_id)
+);
+create index on {SCHEMA}.daily_metrics_old (client_id, date);
+create index on {SCHEMA}.daily_metrics_old (platform, date);
+
+insert into {SCHEMA}.daily_metrics_old
+  (date, platform, client_id, account_id, campaign_id, campaign_name,
+   spend, impressions, reach, clicks, leads, conversations, conversions, revenue)
+select
+  d::date, c.platform, c.client_id, c.account_id, c.campaign_id, c.campaign_name,
+  round((random() * 200)::numeric, 2), (random() * 20000)::bigint, (random() * 15000)::bigint,
+  (random() * 400)::bigint, 0, (random() * 30)::bigint, 0, 0
+from {SCHEMA}.camps c,
+     generate_series(cast(:start as date), cast(:end as date), interval '1 day') d;
+
+-- Formato novo
+create table {SCHEMA}.campaigns (
+  id bigint generated always as identity primary key,
+  client_id uuid not null,
+  platform text not null,
+  account_id text not null,
+  campaign_id text not null,
+  campaign_name text,
+  updated_at timestamptz not null default now(),
+  unique (platform, account_id, campaign_id)
+);
+create index on {SCHEMA}.campaigns (client_id, platform);
+
+insert into {SCHEMA}.campaigns (client_id, platform, account_id, campaign_id, campaign_name)
+select client_id, platform, account_id, campaign_id, campaign_name from {SCHEMA}.camps;
+
+create table {SCHEMA}.daily_metrics_new (
+  date date not null,
+  campaign_key bigint not null,
+  client_id uuid not null,
+  spend numeric(12,2) default 0,
+  impressions bigint default 0,
+  reach bigint default 0,
+  clicks bigint default 0,
+  leads bigint default 0,
+  conversations bigint default 0,
+  conversions bigint default 0,
+  revenue numeric(12,2) default 0,
+  updated_at timestamptz not null default now(),
+  primary key (campaign_key, date)
+);
+create index on {SCHEMA}.daily_metrics_new (client_id, date);
+
+insert into {SCHEMA}.daily_metrics_new
+  (date, campaign_key, client_id,
+   spend, impressions, reach, clicks, leads, conversations, conversions, revenue)
+select
+  o.date, c.id, o.client_id,
+  o.spend, o.impressions, o.reach, o.clicks, o.leads, o.conversations, o.conversions, o.revenue
+from {SCHEMA}.daily_metrics_old o
+join {SCHEMA}.campaigns c
+  on c.platform = o.platform and c.account_id = o.account_id and c.campaign_id = o.campaign_id;
+"""
+
+SIZES_SQL = f"""
+select
+  c.relname,
+  pg_relation_size(c.oid) as table_bytes,
+  pg_indexes_size(c.oid) as index_bytes,
+  pg_total_relation_size(c.oid) as total_bytes
+from pg_class c
+join pg_namespace n on n.oid = c.relnamespace
+where n.nspname = '{SCHEMA}'
+  and c.relname in ('daily_metrics_old', 'daily_metrics_new', 'campaigns');
+"""
+
+# Mesmas queries do app.py (período atual com filtro de plataforma) nos dois formatos
+QUERY_OLD = f"""
+select date, platform, spend, impressions, clicks, leads, conversations, conversions
+from {SCHEMA}.daily_metrics_old
+where client_id = :client_id
+  and date between :start and :end
+  and platform = any(:platforms)
+order by date asc
+"""
+
+QUERY_NEW = f"""
+select m.date, c.platform, m.spend, m.impressions, m.clicks, m.leads, m.conversations, m.conversions
+from {SCHEMA}.daily_metrics_new m
+join {SCHEMA}.campaigns c on c.id = m.campaign_key
+where m.client_id = :client_id
+  and m.date between :start and :end
+  and c.platform = any(:platforms)
+order by m.date asc
+"""
+
+def _mb(n: int) -> str:
+    return f"{n / 1024 / 1024:,.1f} MB"
+
+def explain_ms(conn, sql: str, params: dict, runs: int) -> float:
+    """Melhor 'Execution Time' do EXPLAIN ANALYZE em `runs` execuções."""
+    best = None
+    for _ in range(runs):
+        plan = conn.execute(text("explain (analyze, buffers, format json) " + sql), params).scalar()
+        ms = plan[0]["Execution Time"]
+        best = ms if best is None else min(best, ms)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark formato antigo x novo de daily_metrics")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--campaigns", type=int, default=20, help="campanhas por cliente")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="não apaga o schema de benchmark")
+    args = parser.parse_args()
+
+    end = date.today() - timedelta(days=1)
+    start = end - timedelta(days=args.days - 1)
+
+    engine = get_engine()
+    with engine.begin() as conn:
+        conn.execute(text(SETUP_SQL), {
+            "clients": args.clients, "campaigns": args.campaigns,
+            "start": start, "end": end,
+        })
+
+    try:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for t in ("daily_metrics_old", "daily_metrics_new", "campaigns"):
+                conn.execute(text(f"vacuum analyze {SCHEMA}.{t}"))
+
+            rows = conn.execute(text(f"select count(*) from {SCHEMA}.daily_metrics_old")).scalar()
+            sizes = {r.relname: r for r in conn.execute(text(SIZES_SQL))}
+            old = sizes["daily_metrics_old"]
+            new, dim = sizes["daily_metrics_new"], sizes["campaigns"]
+
+            print(f"{rows:,} linhas ({args.clients} clientes x {args.campaigns} campanhas x {args.days} dias)\n")
+            print(f"{'':<28} {'tabela':>12} {'índices':>12} {'total':>12}")
+            print(f"{'antigo: daily_metrics':<28} {_mb(old.table_bytes):>12} {_mb(old.index_bytes):>12} {_mb(old.total_bytes):>12}")
+            print(f"{'novo: daily_metrics':<28} {_mb(new.table_bytes):>12} {_mb(new.index_bytes):>12} {_mb(new.total_bytes):>12}")
+            print(f"{'novo: campaigns':<28} {_mb(dim.table_bytes):>12} {_mb(dim.index_bytes):>12} {_mb(dim.total_bytes):>12}")
+            new_total = new.total_bytes + dim.total_bytes
+            print(f"economia total: {(1 - new_total / old.total_bytes) * 100:.1f}%\n")
+
+            client_id = conn.execute(text(f"select client_id from {SCHEMA}.camps limit 1")).scalar()
+            print(f"{'scan (EXPLAIN ANALYZE, melhor de ' + str(args.runs) + ')':<40} {'antigo':>10} {'novo':>10}")
+            for label, days in (("cliente, 7 dias", 7), ("cliente, 90 dias", 90), ("cliente, período todo", args.days)):
+                params = {
+                    "client_id": client_id,
+                    "start": end - timedelta(days=min(days, args.days) - 1),
+                    "end": end,
+                    "platforms": ["meta", "google"],
+                }
+                t_old = explain_ms(conn, QUERY_OLD, params, args.runs)
+                t_new = explain_ms(conn, QUERY_NEW, params, args.runs)
+                print(f"{label:<40} {t_old:>8.2f}ms {t_new:>8.2f}ms")
+    finally:
+        if not args.keep:
+            with engine.begin() as conn:
+                conn.execute(text(f"drop schema if exists {SCHEMA} cascade"))
+
+if __name__ == "__main__":
+    main()
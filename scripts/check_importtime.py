@@ -0,0 +1,80 @@
+"""
+Checagem de cold start: importa cada entry point com `python -X importtime`
+e falha se passar do orçamento ou se puxar um módulo pesado que não deveria.
+
+O orçamento é relativo: tempo da dependência que o módulo não tem como evitar
+(ex: `import sqlalchemy`), medido na mesma execução, + uma folga fixa para o
+código do repo. Assim a checagem não depende da velocidade da máquina.
+
+Uso (da raiz do repo, ex: no CI):
+    python scripts/check_importtime.py
+    STARTUP_BUDGET_SCALE=2 python scripts/check_importtime.py   # folga em dobro
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# módulo -> (baseline, folga em ms acima do baseline, módulos que não podem ser importados)
+# Folgas: medido com as versões do requirements.txt ficou entre +20 e +50 ms acima do sqlalchemy.
+HEAVY = ("pandas", "streamlit", "pyarrow", "google.ads", "requests")
+CHECKS = {
+    "etl.run_etl": ("sqlalchemy", 75, HEAVY),
+    "etl.scheduler": ("sqlalchemy", 75, HEAVY),
+    "export": ("sqlalchemy", 100, HEAVY),
+    # Fetcher do Meta pode trazer requests, mas não o resto
+    "etl.meta_fetch": ("requests", 50, ("pandas", "streamlit", "pyarrow", "google.ads")),
+}
+
+RUNS = 3
+
+def import_profile(module: str) -> tuple[float, set[str]]:
+    """Tempo total de import (ms) e todos os módulos carregados, via -X importtime."""
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {module}:\n{proc.stderr}")
+
+    total_us = 0
+    loaded = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Só os imports de primeiro nível somam no total (os aninhados já estão no cumulativo)
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative)
+        loaded.add(name.strip())
+    return total_us / 1000, loaded
+
+def best_of(module: str) -> tuple[float, set[str]]:
+    runs = [import_profile(module) for _ in range(RUNS)]
+    return min(ms for ms, _ in runs), runs[0][1]
+
+def main() -> int:
+    scale = float(os.getenv("STARTUP_BUDGET_SCALE", "1"))
+    baselines = {}
+    failed = False
+    for module, (baseline, extra_ms, forbidden) in CHECKS.items():
+        if baseline not in baselines:
+            baselines[baseline] = best_of(baseline)[0]
+        budget_ms = baselines[baseline] + extra_ms * scale
+
+        best_ms, loaded = best_of(module)
+        heavy = sorted(m for m in loaded if any(m == f or m.startswith(f + ".") for f in forbidden))
+
+        ok = best_ms <= budget_ms and not heavy
+        failed |= not ok
+        status = "OK  " if ok else "FAIL"
+        print(f"{status} {module}: {best_ms:.0f} ms (orçamento {budget_ms:.0f} ms = "
+              f"{baseline} {baselines[baseline]:.0f} ms + {extra_ms * scale:.0f} ms)")
+        if heavy:
+            print(f"     importou módulos pesados: {', '.join(heavy)}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())